@@ -1,5 +1,6 @@
 """API endpoint tests"""
 import unittest
+from unittest import mock
 from fastapi.testclient import TestClient
 from datetime import datetime
 import sys
@@ -8,7 +9,7 @@ import os
 # Add the parent directory to Python path to import final_app
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from final_app import app, TradingStrategy
+from final_app import app, db, TradingStrategy
 
 class TestAPIEndpoints(unittest.TestCase):
     """Test cases for API endpoints"""
@@ -58,6 +59,91 @@ class TestAPIEndpoints(unittest.TestCase):
         # Could be 200 (success) or 400 (insufficient data)
         self.assertIn(response.status_code, [200, 400])
 
+    def test_portfolio_endpoint(self):
+        """Test POST /strategy/portfolio runs a multi-symbol backtest"""
+        series = {
+            symbol: [{"datetime": f"2023-01-{day:02d}T00:00:00", "close": 100.0 + day * step}
+                     for day in range(1, 31)]
+            for symbol, step in (("AAA", 1.0), ("BBB", -0.5))
+        }
+        response = self.client.post("/strategy/portfolio", json={
+            "series": series, "short_window": 5, "long_window": 10
+        })
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["symbols"], ["AAA", "BBB"])
+        self.assertEqual(len(data["equity_curve"]), 30)
+
+        response = self.client.post("/strategy/portfolio", json={
+            "series": series, "short_window": 10, "long_window": 5
+        })
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post("/strategy/portfolio", json={
+            "series": series, "short_window": 0, "long_window": 10
+        })
+        self.assertEqual(response.status_code, 422)
+
+    def test_data_conditional_request(self):
+        """Test GET /data returns an ETag and answers If-None-Match with 304"""
+        response = self.client.get("/data")
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["etag"]
+        self.assertIn("last-modified", response.headers)
+
+        response = self.client.get("/data", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["etag"], etag)
+        self.assertEqual(response.content, b"")
+
+        response = self.client.get("/data", headers={"If-None-Match": 'W/"stale"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_strategy_etag_depends_on_parameters(self):
+        """Test strategy ETags differ per window parameters"""
+        first = self.client.get("/strategy/signals?short_window=5&long_window=20")
+        second = self.client.get("/strategy/signals?short_window=10&long_window=20")
+        if first.status_code != 200 or second.status_code != 200:
+            self.skipTest("Not enough data for strategy")
+
+        self.assertNotEqual(first.headers["etag"], second.headers["etag"])
+        response = self.client.get(
+            "/strategy/signals?short_window=5&long_window=20",
+            headers={"If-None-Match": first.headers["etag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_strategy_validation_before_conditional(self):
+        """Test invalid strategy requests return 400 even with validators"""
+        for headers in ({"If-None-Match": "*"},
+                        {"If-Modified-Since": "Fri, 31 Dec 9999 23:59:59 GMT"}):
+            response = self.client.get(
+                "/strategy/performance?short_window=5&long_window=2000", headers=headers
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_strategy_not_modified_skips_database(self):
+        """Test a matching If-None-Match is answered without querying the DB"""
+        response = self.client.get("/strategy/performance?short_window=5&long_window=20")
+        if response.status_code != 200:
+            self.skipTest("Not enough data for strategy")
+
+        with mock.patch.object(db, "count", side_effect=AssertionError("DB queried")), \
+                mock.patch.object(db, "conn", None):
+            response = self.client.get(
+                "/strategy/performance?short_window=5&long_window=20",
+                headers={"If-None-Match": response.headers["etag"]}
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_data_response_compressed(self):
+        """Test large JSON bodies are compressed when the client accepts it"""
+        response = self.client.get("/data", headers={"Accept-Encoding": "gzip"})
+        if len(response.content) < 1000:
+            self.skipTest("Response too small to compress")
+        self.assertEqual(response.headers.get("content-encoding"), "gzip")
+
     # Remove the test_strategy_signals_endpoint method since the endpoint doesn't exist
 
 if __name__ == '__main__':
@@ -2,12 +2,14 @@
 import unittest
 import sys
 import os
-from datetime import datetime, timedelta
+import math
+import numpy as np
+from datetime import datetime, timedelta, timezone
 
 # Add the parent directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
-from final_app import TradingStrategy
+from final_app import TradingStrategy, PortfolioStrategy
 
 class TestTradingStrategy(unittest.TestCase):
     """Test cases for trading strategy implementation"""
@@ -91,5 +93,118 @@ class TestTradingStrategy(unittest.TestCase):
         self.assertEqual(performance.total_return, 0.0)
         self.assertEqual(performance.signals, [])
 
+class TestPortfolioStrategy(unittest.TestCase):
+    """Test cases for the multi-symbol portfolio backtest"""
+
+    def make_series(self, closes, start_day=0):
+        return [(datetime(2023, 1, 1) + timedelta(days=start_day + i), close)
+                for i, close in enumerate(closes)]
+
+    def test_align_close_series(self):
+        """Test series are aligned on a shared index with gaps forward-filled"""
+        series = {
+            'BBB': self.make_series([10.0, 11.0, 12.0], start_day=1),
+            'AAA': [self.make_series([1.0, 2.0, 3.0, 4.0])[i] for i in (0, 1, 3)],
+        }
+        dates, symbols, closes = PortfolioStrategy.align_close_series(series)
+
+        self.assertEqual(symbols, ['AAA', 'BBB'])
+        self.assertEqual(len(dates), 4)
+        self.assertEqual(closes[:, 0].tolist(), [1.0, 2.0, 2.0, 4.0])
+        self.assertTrue(math.isnan(closes[0, 1]))
+        self.assertEqual(closes[1:, 1].tolist(), [10.0, 11.0, 12.0])
+
+    def test_align_close_series_timezones(self):
+        """Test aware datetimes are ordered by instant, not by their text"""
+        ist = timezone(timedelta(hours=5, minutes=30))
+        series = {
+            'IST': [(datetime(2023, 1, 1, tzinfo=ist), 1.0)],
+            'UTC': [(datetime(2023, 1, 1, tzinfo=timezone.utc), 2.0)],
+        }
+        dates, _, closes = PortfolioStrategy.align_close_series(series)
+
+        self.assertEqual(dates, [datetime(2022, 12, 31, 18, 30, tzinfo=timezone.utc),
+                                 datetime(2023, 1, 1, tzinfo=timezone.utc)])
+        self.assertEqual(closes[:, 0].tolist(), [1.0, 1.0])
+
+        series['NAIVE'] = [(datetime(2023, 1, 1), 3.0)]
+        with self.assertRaises(ValueError):
+            PortfolioStrategy.align_close_series(series)
+
+    def test_align_close_series_duplicates(self):
+        """Test repeated instants within one symbol are rejected"""
+        with self.assertRaises(ValueError):
+            PortfolioStrategy.align_close_series({'AAA': self.make_series([1.0, 2.0]) * 2})
+
+        ist = timezone(timedelta(hours=5, minutes=30))
+        same_instant = [(datetime(2023, 1, 1, 5, 30, tzinfo=ist), 1.0),
+                        (datetime(2023, 1, 1, tzinfo=timezone.utc), 2.0)]
+        with self.assertRaises(ValueError):
+            PortfolioStrategy.align_close_series({'AAA': same_instant})
+
+        # The same instant in different symbols is fine
+        dates, _, _ = PortfolioStrategy.align_close_series(
+            {'AAA': same_instant[:1], 'BBB': same_instant[1:]}
+        )
+        self.assertEqual(len(dates), 1)
+
+    def test_moving_average_matches_single_symbol(self):
+        """Test matrix moving average agrees with the per-series implementation"""
+        prices = [100.0 + (i % 7) * 1.5 for i in range(40)]
+        series = {'AAA': self.make_series(prices), 'BBB': self.make_series(prices[::-1])}
+        _, _, closes = PortfolioStrategy.align_close_series(series)
+        ma = PortfolioStrategy.calculate_moving_average(closes, 5)
+
+        for col, column_prices in enumerate([prices, prices[::-1]]):
+            expected = TradingStrategy.calculate_moving_average(column_prices, 5)
+            self.assertTrue(all(math.isnan(v) for v in ma[:4, col]))
+            for actual, value in zip(ma[4:, col], expected[4:]):
+                self.assertAlmostEqual(actual, value)
+
+    def test_portfolio_performance(self):
+        """Test weights are normalized and the equity curve covers every date"""
+        rising = [100.0 + i for i in range(30)]
+        falling = [100.0 - i for i in range(30)]
+        series = {'UP': self.make_series(rising), 'DOWN': self.make_series(falling)}
+
+        performance = PortfolioStrategy.calculate_portfolio_performance(
+            series, {'UP': 3.0, 'DOWN': 1.0}, short_window=3, long_window=5
+        )
+
+        self.assertEqual(performance.weights, {'DOWN': 0.25, 'UP': 0.75})
+        self.assertEqual(len(performance.equity_curve), 30)
+        self.assertEqual(performance.equity_curve[0]['equity'], 1.0)
+
+        # No crossover on a monotonic series, so no position and no return
+        self.assertEqual(performance.trades_per_symbol, {'DOWN': 0, 'UP': 0})
+        self.assertEqual(performance.total_return, 0.0)
+
+        with self.assertRaises(ValueError):
+            PortfolioStrategy.calculate_portfolio_performance(series, {'OTHER': 1.0}, 3, 5)
+
+    def test_portfolio_trades_match_returns(self):
+        """Test returns are only earned between a BUY and the following SELL"""
+        v_shape = [110.0 - i for i in range(10)] + [100.0 + 2 * i for i in range(1, 11)]
+        series = {'V': self.make_series(v_shape)}
+
+        bought = PortfolioStrategy.calculate_portfolio_performance(series, None, 3, 5)
+        self.assertEqual(bought.total_trades, 1)
+        self.assertGreater(bought.total_return, 0)
+
+        round_trip = v_shape + [120.0 - 3 * i for i in range(1, 11)]
+        series = {'V': self.make_series(round_trip)}
+
+        sold = PortfolioStrategy.calculate_portfolio_performance(series, None, 3, 5)
+        self.assertEqual(sold.total_trades, 2)
+        flat = [point['equity'] for point in sold.equity_curve[-5:]]
+        self.assertEqual(len(set(flat)), 1)
+
+    def test_moving_average_invalid_window(self):
+        """Test matrix moving average rejects windows below 1"""
+        closes = np.ones((5, 1))
+        for window in (0, -3):
+            with self.assertRaises(ValueError):
+                PortfolioStrategy.calculate_moving_average(closes, window)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -4,12 +4,22 @@ FINAL WORKING TRADING API
 """
 import uvicorn
 import sqlite3
-from datetime import datetime, timedelta
-from fastapi import FastAPI, HTTPException, Query
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+import numpy as np
 import random
+from operator import itemgetter
+
+try:
+    from brotli_asgi import BrotliMiddleware  # brotli with gzip fallback
+except ImportError:
+    BrotliMiddleware = None
 
 print("🚀 FINAL TRADING API - READY TO RUN")
 print("=" * 50)
@@ -40,6 +50,13 @@ class Database:
         if cursor.fetchone()[0] == 0:
             self.add_sample_data()
 
+        # Data version = id of the last inserted row, bumped on every insert.
+        # Insert times are not stored, so last_modified is process start or last insert.
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM stock_data")
+        self.data_version = cursor.fetchone()[0]
+        self.record_count = self.count()
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+
         print("✅ Database ready")
 
     def add_sample_data(self):
@@ -84,6 +101,9 @@ class Database:
                 data['close'], data['volume']
             ))
             self.conn.commit()
+            self.data_version = cursor.lastrowid
+            self.record_count += 1
+            self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
             return cursor.lastrowid
         except sqlite3.IntegrityError:
             raise Exception("Record exists")
@@ -118,6 +138,25 @@ class StrategyPerformance(BaseModel):
     total_return: float
     signals: List[dict]
 
+class PricePoint(BaseModel):
+    datetime: datetime
+    close: float
+
+class PortfolioRequest(BaseModel):
+    series: Dict[str, List[PricePoint]]
+    weights: Optional[Dict[str, float]] = None
+    short_window: int = Field(10, ge=2, description="Short moving average window")
+    long_window: int = Field(30, ge=5, description="Long moving average window")
+
+class PortfolioPerformance(BaseModel):
+    symbols: List[str]
+    weights: Dict[str, float]
+    total_trades: int
+    trades_per_symbol: Dict[str, int]
+    total_return: float
+    max_drawdown: float
+    equity_curve: List[dict]
+
 # ==================== TRADING STRATEGY CLASS ====================
 class TradingStrategy:
     """Moving Average Crossover Strategy - Pure Python"""
@@ -190,12 +229,213 @@ class TradingStrategy:
             signals=detailed_signals
         )
 
+# ==================== PORTFOLIO STRATEGY CLASS ====================
+class PortfolioStrategy:
+    """Moving Average Crossover Strategy over many symbols - NumPy matrix version"""
+
+    @staticmethod
+    def align_close_series(series: Dict[str, List[tuple]]):
+        """Align (datetime, close) series on a shared index into a (dates x symbols) matrix.
+
+        Timezone-aware datetimes are normalised to UTC so bars sort by time; mixing
+        aware and naive datetimes, or repeating an instant within one symbol, is
+        rejected. Gaps after a symbol's first bar are forward-filled; bars before it
+        stay NaN.
+        """
+        symbols = sorted(series)
+        stamps, prices, aware = [], [], set()
+        for symbol in symbols:
+            points = series[symbol]
+            column = list(map(itemgetter(0), points))
+            column_prices = np.fromiter(map(itemgetter(1), points), dtype=float, count=len(points))
+            naive = list(map(datetime.utcoffset, column)).count(None)
+            if 0 < naive < len(column):
+                raise ValueError("Cannot mix timezone-aware and naive datetimes")
+            if column:
+                aware.add(naive == 0)
+            # Aware datetimes hash and compare by instant, so offsets need no normalising here
+            if len(set(column)) != len(column):
+                raise ValueError(f"Duplicate timestamps in series for {symbol}")
+            stamps.append(column)
+            prices.append(column_prices)
+
+        if len(aware) > 1:
+            raise ValueError("Cannot mix timezone-aware and naive datetimes")
+
+        dates = sorted(set().union(*stamps))
+        date_index = dict(zip(dates, range(len(dates))))
+
+        # Fill symbol-major so each write is contiguous, then view as (dates x symbols)
+        closes = np.full((len(symbols), len(dates)), np.nan)
+        for col, (column, column_prices) in enumerate(zip(stamps, prices)):
+            rows = np.fromiter(map(date_index.__getitem__, column), dtype=np.intp, count=len(column))
+            closes[col, rows] = column_prices
+        closes = closes.T
+
+        if True in aware:
+            dates = [d.astimezone(timezone.utc) for d in dates]
+
+        # Forward fill: carry the index of the last valid row down each column
+        if closes.size:
+            valid = ~np.isnan(closes)
+            last_valid = np.where(valid, np.arange(len(dates))[:, None], 0)
+            np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+            closes = closes[last_valid, np.arange(len(symbols))]
+
+        return dates, symbols, closes
+
+    @staticmethod
+    def calculate_moving_average(closes: np.ndarray, window: int) -> np.ndarray:
+        """Simple moving average of every column at once; NaN until a full window exists"""
+        if window < 1:
+            raise ValueError("Window must be at least 1")
+
+        valid = ~np.isnan(closes)
+        zero = np.zeros((1, closes.shape[1]))
+        price_sum = np.concatenate([zero, np.cumsum(np.where(valid, closes, 0.0), axis=0)])
+        valid_count = np.concatenate([zero, np.cumsum(valid, axis=0)])
+
+        ma = np.full(closes.shape, np.nan)
+        if window <= closes.shape[0]:
+            window_sum = price_sum[window:] - price_sum[:-window]
+            full = (valid_count[window:] - valid_count[:-window]) == window
+            ma[window - 1:] = np.where(full, window_sum / window, np.nan)
+        return ma
+
+    @staticmethod
+    def calculate_signals(short_ma: np.ndarray, long_ma: np.ndarray) -> np.ndarray:
+        """1 where short MA crosses above long MA, -1 where it crosses below, else 0"""
+        signals = np.zeros(short_ma.shape, dtype=int)
+        if short_ma.shape[0] < 2:
+            return signals
+
+        ready = ~(np.isnan(short_ma) | np.isnan(long_ma))
+        ready = ready[1:] & ready[:-1]
+        prev_diff = short_ma[:-1] - long_ma[:-1]
+        diff = short_ma[1:] - long_ma[1:]
+        signals[1:][ready & (prev_diff <= 0) & (diff > 0)] = 1
+        signals[1:][ready & (prev_diff >= 0) & (diff < 0)] = -1
+        return signals
+
+    @staticmethod
+    def normalize_weights(symbols: List[str], weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """Allocation weights in column order, scaled to sum to 1 (equal weight by default)"""
+        if not weights:
+            return np.full(len(symbols), 1.0 / len(symbols))
+
+        unknown = set(weights) - set(symbols)
+        if unknown:
+            raise ValueError(f"Weights given for unknown symbols: {', '.join(sorted(unknown))}")
+
+        allocation = np.array([weights.get(symbol, 0.0) for symbol in symbols], dtype=float)
+        if (allocation < 0).any() or allocation.sum() <= 0:
+            raise ValueError("Weights must be non-negative and sum to more than zero")
+        return allocation / allocation.sum()
+
+    @staticmethod
+    def calculate_portfolio_performance(series: Dict[str, List[tuple]], weights: Optional[Dict[str, float]] = None,
+                                        short_window: int = 10, long_window: int = 30) -> PortfolioPerformance:
+        """Backtest the crossover strategy on every symbol in one pass and combine into an equity curve"""
+        if not series:
+            raise ValueError("At least one symbol is required")
+
+        dates, symbols, closes = PortfolioStrategy.align_close_series(series)
+        allocation = PortfolioStrategy.normalize_weights(symbols, weights)
+
+        short_ma = PortfolioStrategy.calculate_moving_average(closes, short_window)
+        long_ma = PortfolioStrategy.calculate_moving_average(closes, long_window)
+        signals = PortfolioStrategy.calculate_signals(short_ma, long_ma)
+
+        # Enter on BUY, exit on SELL: carry the last non-zero signal down each column
+        last_signal = np.where(signals != 0, np.arange(len(dates))[:, None], 0)
+        np.maximum.accumulate(last_signal, axis=0, out=last_signal)
+        in_market = (signals[last_signal, np.arange(len(symbols))] == 1).astype(float)
+
+        # Positions act on the bar after the signal; every entry and exit is a trade
+        positions = np.zeros(closes.shape)
+        positions[1:] = in_market[:-1]
+
+        returns = np.zeros(closes.shape)
+        if len(dates) > 1:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                returns[1:] = closes[1:] / closes[:-1] - 1.0
+            returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+        portfolio_returns = (positions * returns) @ allocation
+        equity = np.cumprod(1.0 + portfolio_returns)
+        drawdown = 1.0 - equity / np.maximum.accumulate(equity) if len(dates) else np.zeros(0)
+        trades = np.count_nonzero(np.diff(positions, axis=0, prepend=0.0), axis=0)
+
+        return PortfolioPerformance(
+            symbols=symbols,
+            weights={symbol: round(float(w), 4) for symbol, w in zip(symbols, allocation)},
+            total_trades=int(trades.sum()),
+            trades_per_symbol={symbol: int(n) for symbol, n in zip(symbols, trades)},
+            total_return=round(float(equity[-1] - 1.0), 4) if len(dates) else 0.0,
+            max_drawdown=round(float(drawdown.max()), 4) if len(dates) else 0.0,
+            equity_curve=[
+                {'datetime': d.isoformat(), 'equity': round(float(e), 4)} for d, e in zip(dates, equity)
+            ]
+        )
+
 # ==================== TRADING STRATEGY WRAPPER ====================
 def calculate_strategy(short_window=10, long_window=30):
     """Wrapper function for the strategy endpoint"""
     data = db.get_all_data()
     return TradingStrategy.calculate_strategy_performance(data, short_window, long_window)
 
+# ==================== HTTP CACHING ====================
+def data_etag(request: Request) -> str:
+    """Weak ETag for the current data version and the request's path + query"""
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    key = f"{db.data_version}:{request.url.path}?{query}"
+    return 'W/"' + hashlib.md5(key.encode(), usedforsecurity=False).hexdigest() + '"'
+
+def opaque_tag(tag: str) -> str:
+    """Strip the weak prefix so ETags compare weakly"""
+    return tag[2:] if tag.startswith("W/") else tag
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Check If-None-Match (weak comparison), falling back to If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or opaque_tag(etag) in [opaque_tag(tag) for tag in tags]
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return db.last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def cache_headers(etag: str) -> dict:
+    """Validator headers; no-cache makes clients revalidate on every poll.
+
+    Last-Modified is the process start time or the last insert through this
+    process, whichever is later, so it moves forward on restart while the ETag
+    stays the same. The ETag is the authoritative validator.
+    """
+    return {
+        "ETag": etag,
+        "Last-Modified": format_datetime(db.last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+def not_modified_response(request: Request, response: Response):
+    """Return a 304 if the client's copy is current, else tag the outgoing response.
+
+    Call only after the request has passed validation, so an If-None-Match of *
+    is matched against a representation that actually exists.
+    """
+    etag = data_etag(request)
+    headers = cache_headers(etag)
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
 # ==================== FASTAPI APP ====================
 app = FastAPI(
     title="Trading Strategy API",
@@ -208,8 +448,15 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified"],
 )
 
+# Compress large JSON bodies (brotli when available and accepted, otherwise gzip)
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=1000, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 @app.get("/")
 async def root():
     return {
@@ -218,12 +465,17 @@ async def root():
         "endpoints": {
             "GET /data": "Fetch all stock data",
             "POST /data": "Add new stock record",
-            "GET /strategy/performance": "Trading strategy results"
+            "GET /strategy/performance": "Trading strategy results",
+            "POST /strategy/portfolio": "Strategy results across many symbols"
         }
     }
 
 @app.get("/data", response_model=List[StockDataResponse])
-async def get_all_data():
+async def get_all_data(request: Request, response: Response):
+    cached = not_modified_response(request, response)
+    if cached:
+        return cached
+
     rows = db.get_all_data()
     data = []
     for row in rows:
@@ -262,20 +514,43 @@ async def create_data(stock_data: StockDataCreate):
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/strategy/performance", response_model=StrategyPerformance)
-async def get_strategy_performance(short_window: int = 10, long_window: int = 30):
+async def get_strategy_performance(request: Request, response: Response,
+                                   short_window: int = 10, long_window: int = 30):
     if short_window >= long_window:
         raise HTTPException(status_code=400, detail="Short window must be less than long window")
 
-    if db.count() < long_window:
+    if db.record_count < long_window:
         raise HTTPException(
             status_code=400,
-            detail=f"Need at least {long_window} records. Available: {db.count()}"
+            detail=f"Need at least {long_window} records. Available: {db.record_count}"
         )
 
+    cached = not_modified_response(request, response)
+    if cached:
+        return cached
+
     return calculate_strategy(short_window, long_window)
 
+@app.post("/strategy/portfolio", response_model=PortfolioPerformance)
+async def get_portfolio_performance(portfolio: PortfolioRequest):
+    if portfolio.short_window >= portfolio.long_window:
+        raise HTTPException(status_code=400, detail="Short window must be less than long window")
+
+    series = {
+        symbol: [(point.datetime, point.close) for point in points]
+        for symbol, points in portfolio.series.items()
+    }
+    try:
+        return PortfolioStrategy.calculate_portfolio_performance(
+            series, portfolio.weights, portfolio.short_window, portfolio.long_window
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/strategy/signals")
 async def get_recent_signals(
+    request: Request,
+    response: Response,
     short_window: int = Query(10, ge=2, le=50, description="Short moving average window"),
     long_window: int = Query(30, ge=5, le=100, description="Long moving average window")
 ):
@@ -283,12 +558,16 @@ async def get_recent_signals(
     if short_window >= long_window:
         raise HTTPException(status_code=400, detail="Short window must be less than long window")
 
-    if db.count() < long_window:
+    if db.record_count < long_window:
         raise HTTPException(
             status_code=400,
-            detail=f"Need at least {long_window} records. Available: {db.count()}"
+            detail=f"Need at least {long_window} records. Available: {db.record_count}"
         )
 
+    cached = not_modified_response(request, response)
+    if cached:
+        return cached
+
     performance = calculate_strategy(short_window, long_window)
     return {
         "recent_signals": performance.signals,